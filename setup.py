@@ -12,6 +12,8 @@ with open('HISTORY.rst') as history_file:
 
 requirements = [
     "jstyleson",
+    "orjson",
+    "pynvml",
 ]
 
 test_requirements = ['pytest>=3', ]
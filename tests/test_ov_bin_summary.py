@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""Tests for `toytools.openvino.ov_bin_summary`."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from toytools.openvino.ov_bin_summary import OVBinSummary  # noqa: E402
+
+
+@pytest.fixture
+def ir(tmp_path):
+    """A small IR whose .bin holds two large constants between raw gaps.
+
+    Returns the .xml path and the original .bin bytes.
+    """
+    rng = np.random.default_rng(0)
+    gap = rng.integers(0, 255, size=5, dtype=np.uint8).tobytes()
+    weight = rng.standard_normal(16).astype(np.float32).tobytes()
+    small = np.arange(4, dtype=np.float32).tobytes()  # too small to be replaced
+    bias = rng.standard_normal(12).astype(np.float32).tobytes()
+    tail = b"tail"
+    data = gap + weight + small + bias + tail
+    layers = [
+        ("weight", "16", len(gap), len(weight)),
+        ("small", "4", len(gap) + len(weight), len(small)),
+        ("bias", "3,4", len(gap) + len(weight) + len(small), len(bias)),
+    ]
+    xml = "".join(
+        f'<layer id="{i}" name="{name}" type="Const" version="opset1">'
+        f'<data element_type="f32" shape="{shape}" offset="{offset}" size="{size}"/></layer>'
+        for i, (name, shape, offset, size) in enumerate(layers)
+    )
+    xml_path = tmp_path / "model.xml"
+    xml_path.write_text(f'<?xml version="1.0"?><net name="m" version="11"><layers>{xml}</layers><edges/></net>')
+    (tmp_path / "model.bin").write_bytes(data)
+    return xml_path, data
+
+
+def _expected_bin(summary, data, fill):
+    return b"".join(
+        data[part.start:part.start + part.length] if part.value is not None else fill * part.length
+        for part in summary.parts
+    )
+
+
+@pytest.mark.parametrize("bytes_generator, fill", [("ones", b"\x01"), ("zeros", b"\x00")])
+def test_to_bin(ir, tmp_path, bytes_generator, fill):
+    """Constants are filled in and the raw gaps are copied, including trailing zero holes."""
+    xml_path, data = ir
+    with OVBinSummary.from_xml(xml_path) as summary:
+        out = summary.to_bin(tmp_path / "out.bin", bytes_generator)
+        assert open(out, "rb").read() == _expected_bin(summary, data, fill)
+
+    summary.parts = summary.parts[:2]  # ends in a constant, so the file ends in a hole
+    summary.to_bin(tmp_path / "hole.bin", "zeros")
+    assert (tmp_path / "hole.bin").read_bytes() == data[:5] + bytes(64)
+
+
+def test_to_bin_over_source(ir):
+    """Writing over the mapped source .bin must not pull pages from under the stored values."""
+    xml_path, data = ir
+    summary = OVBinSummary.from_xml(xml_path)
+    summary.to_bin(xml_path.with_suffix(".bin"))
+    assert xml_path.with_suffix(".bin").read_bytes() == _expected_bin(summary, data, b"\x01")
+    summary.close()
+
+
+def test_close_unmaps_source(ir, tmp_path):
+    """close() unmaps the source .bin and the summary stays usable."""
+    xml_path, data = ir
+    with OVBinSummary.from_xml(xml_path) as summary:
+        source = summary._source_mm
+    assert source.closed
+    summary.to_bin(tmp_path / "out.bin")
+    assert (tmp_path / "out.bin").read_bytes() == _expected_bin(summary, data, b"\x01")
+
+
+def test_from_xml_reads_const_offsets(ir):
+    """Const layers larger than 10 elements are taken from the XML offsets, by layer name."""
+    xml_path, data = ir
+    with OVBinSummary.from_xml(xml_path) as summary:
+        parts = [(part.start, part.length, part.op_name, part.value is not None) for part in summary.parts]
+    assert parts == [
+        (0, 5, None, True),
+        (5, 64, "weight", False),
+        (69, 16, None, True),  # "small" stays in the raw gap
+        (85, 48, "bias", False),
+        (133, 4, None, True),
+    ]
+
+
+def test_from_xml_rejects_short_bin(ir):
+    """A .bin that does not match the XML is an error instead of a wrong-sized output."""
+    xml_path, data = ir
+    xml_path.with_suffix(".bin").write_bytes(data[:100])
+    with pytest.raises(ValueError):
+        OVBinSummary.from_xml(xml_path)
+
+
+def test_summary_roundtrip(ir, tmp_path):
+    """A summary saved as header + .npy loads back to the same parts and the same .bin."""
+    xml_path, data = ir
+    with OVBinSummary.from_xml(xml_path) as summary:
+        summary.to_bin(tmp_path / "expected.bin")
+        summary.to_summary(tmp_path / "model.summary")
+    assert (tmp_path / "model.summary.npy").exists()
+
+    with OVBinSummary.from_summary(tmp_path / "model.summary") as loaded:
+        assert [(p.start, p.length, p.op_name) for p in loaded.parts] == \
+            [(p.start, p.length, p.op_name) for p in summary.parts]
+        assert [bytes(p.value) if p.value is not None else None for p in loaded.parts] == \
+            [bytes(p.value) if p.value is not None else None for p in summary.parts]
+        # Saving over the files it was loaded from must not truncate its own mapping.
+        loaded.to_summary(tmp_path / "model.summary")
+
+    with OVBinSummary.from_summary(tmp_path / "model.summary") as reloaded:
+        reloaded.to_bin(tmp_path / "out.bin")
+    assert (tmp_path / "out.bin").read_bytes() == (tmp_path / "expected.bin").read_bytes()
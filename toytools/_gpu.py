@@ -0,0 +1,48 @@
+import heapq
+import time
+
+_FREE_MEM_TTL = 0.5  # seconds
+_free_mem_cache = {"ts": 0.0, "val": None}
+
+
+def _query_free_mem():
+    if _free_mem_cache["val"] is not None and time.monotonic() - _free_mem_cache["ts"] < _FREE_MEM_TTL:
+        return list(_free_mem_cache["val"])
+    import pynvml
+
+    pynvml.nvmlInit()
+    try:
+        free_mem = [
+            (-(pynvml.nvmlDeviceGetMemoryInfo(pynvml.nvmlDeviceGetHandleByIndex(i)).free // (1024 * 1024)), i)
+            for i in range(pynvml.nvmlDeviceGetCount())
+        ]
+    finally:
+        pynvml.nvmlShutdown()
+    _free_mem_cache.update(ts=time.monotonic(), val=free_mem)
+    return list(free_mem)
+
+
+def avail_cuda_list(memory_requirement: int):
+    free_mem = _query_free_mem()
+    heapq.heapify(free_mem)
+
+    def _get_one(free_mem):
+        free, idx = free_mem[0]
+        if free + memory_requirement > -20:
+            return -1
+        heapq.heapreplace(free_mem, (free + memory_requirement, idx))
+        return idx
+
+    result = []
+    i = _get_one(free_mem)
+    while i >= 0:
+        result.append(i)
+        i = _get_one(free_mem)
+    return result
+
+
+def _cache_clear():
+    _free_mem_cache["val"] = None
+
+
+avail_cuda_list.cache_clear = _cache_clear
@@ -1,11 +1,9 @@
 import asyncio
-import heapq
-import json
 import logging
 import os
-import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from copy import deepcopy
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Union
@@ -13,54 +11,79 @@ from unittest.mock import Mock
 import time
 import platform
 
+import orjson
+
+from .._gpu import avail_cuda_list  # noqa: F401 (re-exported by toytools.batchrun)
+
 logging.basicConfig(format="%(asctime)s %(levelname)-8s %(message)s", level=logging.INFO, datefmt="%Y-%m-%d %H:%M:%S")
 logger = logging.getLogger("toytools.batchrun")
 logger.setLevel(logging.INFO)
 CUDA_VISIBLE_DEVICES = "CUDA_VISIBLE_DEVICES"
+_HOST_INFO = platform.uname()._asdict()
+_BASE_ENV = dict(os.environ)
+_BASE_ENV_SORTED = dict(sorted(_BASE_ENV.items()))
+_SHELL_METACHARS = frozenset("|&;<>()$`\\\"'*?[]#~{}\n")
+
+
+def _json_default(obj: Any):
+    if isinstance(obj, tuple):  # e.g. time.struct_time
+        return list(obj)
+    raise TypeError
 
 
-def avail_cuda_list(memory_requirement: int):
-    with subprocess.Popen(
-        "nvidia-smi -q -d Memory | grep -A5 GPU | grep Free", shell=True, stdout=subprocess.PIPE
-    ) as p:
-        free_mem = [(-int(x.split()[2]), i) for i, x in enumerate(p.stdout.readlines())]
+def _atomic_json_write(path: Path, obj: Any):
+    data = orjson.dumps(obj, default=_json_default, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "wb", buffering=64 * 1024) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
 
-    heapq.heapify(free_mem)
 
-    def _get_one(free_mem):
-        free, idx = free_mem[0]
-        if free + memory_requirement > -20:
-            return -1
-        heapq.heapreplace(free_mem, (free + memory_requirement, idx))
-        return idx
+def _sorted_env(task_env: Dict[str, str], env: Dict[str, str]) -> Dict[str, str]:
+    if task_env == _BASE_ENV:
+        # Only CUDA_VISIBLE_DEVICES differs; it stays in place if already set, else goes last.
+        return {**_BASE_ENV_SORTED, CUDA_VISIBLE_DEVICES: env[CUDA_VISIBLE_DEVICES]}
+    return dict(sorted(env.items()))
 
-    result = []
-    i = _get_one(free_mem)
-    while i >= 0:
-        result.append(i)
-        i = _get_one(free_mem)
-    return result
+
+def _needs_shell(cmd_str: str) -> bool:
+    # Leading `VAR=value` assignments also need a shell to take effect.
+    tokens = cmd_str.split()
+    return any(c in _SHELL_METACHARS for c in cmd_str) or bool(tokens and "=" in tokens[0])
 
 
 class ResourceManager:
     def __init__(self, items: List[Any]) -> None:
-        self._resources = asyncio.Queue()
-        for item in items:
-            self._resources.put_nowait(item)
-        self._lock = asyncio.Lock()
+        self._items = deque(items)
+        self._sem = asyncio.Semaphore(len(self._items))
+        self._multi_lock = asyncio.Lock()
+
+    async def _acquire(self, quantity: int):
+        acquired = 0
+        try:
+            while acquired < quantity:
+                await self._sem.acquire()
+                acquired += 1
+        except BaseException:
+            for _ in range(acquired):
+                self._sem.release()
+            raise
 
     @asynccontextmanager
     async def allocate(self, quantity: int = 1):
-        items = []
-        while len(items) < quantity:
-            async with self._lock:
-                if self._resources.qsize() >= quantity:
-                    for _ in range(quantity):
-                        items.append(await self._resources.get())
-            await asyncio.sleep(1)
-        yield items
-        for item in items:
-            await self._resources.put(item)
+        if quantity == 1:
+            await self._sem.acquire()
+        else:
+            # Only one task may hold a partial allocation, otherwise two of them can deadlock.
+            async with self._multi_lock:
+                await self._acquire(quantity)
+        items = [self._items.popleft() for _ in range(quantity)]
+        try:
+            yield items
+        finally:
+            self._items.extend(items)
+            for _ in range(quantity):
+                self._sem.release()
 
 
 @dataclass
@@ -77,6 +100,7 @@ class Task:
         prepare_fn_args: Optional[tuple] = None,
     ) -> None:
         self.cmd = cmd
+        self._cmd_list = list(map(str, cmd.split() if isinstance(cmd, str) else cmd))
         self.cwd = cwd
         self.io_folder = Path(io_folder).resolve()
         self.env = env or os.environ.copy()
@@ -86,14 +110,13 @@ class Task:
         self.identifier = str(identifier) or self.cmd_str()
 
     def cmd_str(self):
-        cmd_l = self.cmd.split() if isinstance(self.cmd, str) else self.cmd
-        return " ".join(map(str, cmd_l))
+        return " ".join(self._cmd_list)
 
     def cmd_list(self):
-        return self.cmd_str().split()
+        return self._cmd_list
 
     def cmd_bash(self):
-        return ' \\\n    '.join(x.strip() for x in self.cmd_list())
+        return ' \\\n    '.join(x.strip() for x in self._cmd_list)
 
 
 def pre_launch_worker(io_folder):
@@ -110,16 +133,29 @@ class Launcher:
         asyncio.run(self._run(tasks))
 
     async def _run(self, tasks):
+        # JSON writes are offloaded to the default executor; size it to the task count.
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(1, min(32, len(tasks)))))
         rm = ResourceManager(self.cuda_list)
-        jobs = [self._launch_task(task, i, rm, total=len(tasks)) for i, task in enumerate(tasks)]
-        await asyncio.gather(*jobs)
+        sem = asyncio.Semaphore(len(self.cuda_list))
+
+        async def _bounded_launch(task: Task, task_id: int):
+            async with sem:
+                try:
+                    return await self._launch_task(task, task_id, rm, total=len(tasks))
+                except Exception:
+                    logger.exception("FAIL Task[%d/%d]: %s", task_id, len(tasks), task.identifier)
+                    return "FAIL"
+
+        jobs = [asyncio.ensure_future(_bounded_launch(task, i)) for i, task in enumerate(tasks)]
+        for job in asyncio.as_completed(jobs):
+            await job
 
     async def _launch_task(self, task: Task, task_id: int, resource_manager: ResourceManager, **kwargs) -> str:
         total = str(kwargs.get('total', '?'))
         async with resource_manager.allocate(quantity=task.cuda_quantity) as cuda_list:
             cuda = ",".join(map(str, cuda_list))
             logging_callback = lambda pid: logger.info("Running Task[%d/%s] PID=%d CUDA=%s: %s", task_id, total, pid, cuda, task.identifier)
-            env = deepcopy(task.env)
+            env = dict(task.env)
             env[CUDA_VISIBLE_DEVICES] = str(cuda)
             task.prepare_fn(*task.prepare_fn_args)
 
@@ -131,64 +167,58 @@ class Launcher:
                 "cmd_str": task.cmd_str(),
                 "cwd": Path(task.cwd).absolute().as_posix(),
                 "cmd_list": task.cmd_list(),
-                "env": dict(sorted(env.items())),
-                "host": platform.uname()._asdict(),
+                "env": _sorted_env(task.env, env),
+                "host": _HOST_INFO,
                 'launch_time': time.localtime(),
             }
-            with open(task_description_folder / "full_description.json", "w", encoding="utf-8") as f_task_desc:
-                json.dump(
-                    full_info,
-                    f_task_desc,
-                    indent=4,
-                )
             with open(task_description_folder / "task_script.bash", "w", encoding="utf-8") as f_task_desc:
                 f_task_desc.write(task.cmd_bash())
 
-            with open(io_folder / "task_description.json", "w", encoding="utf-8") as f_task_desc:
-                cwd = Path(task.cwd).absolute()
-                json.dump(
-                    {
-                        "cwd": cwd.relative_to(Path.home()).as_posix() if cwd.is_relative_to(Path.home()) else cwd.as_posix(),
-                        "cmd_list": task.cmd_list(),
-                    },
-                    f_task_desc,
-                    indent=4,
-                )
+            cwd = Path(task.cwd).absolute()
+            await asyncio.to_thread(
+                _atomic_json_write,
+                io_folder / "task_description.json",
+                {
+                    "cwd": cwd.relative_to(Path.home()).as_posix() if cwd.is_relative_to(Path.home()) else cwd.as_posix(),
+                    "cmd_list": task.cmd_list(),
+                },
+            )
             start_time = time.time()
-            proc = await self._run_single_process(task.cmd_str(), task.io_folder, task.cwd, env, task_description_folder, full_info, logging_callback)
+            cmd = task.cmd_str() if _needs_shell(task.cmd_str()) else task.cmd_list()
+            proc = await self._run_single_process(cmd, task.io_folder, task.cwd, env, task_description_folder, full_info, logging_callback)
             status = "SUCCESS" if proc.returncode == 0 else "FAIL"
             cost_time = time.time() - start_time
             log_fn = logger.warning if proc.returncode == 0 else logger.error
             log_fn("%s Task[%d/%s] PID=%d CUDA=%s (time: %ds): %s", status, task_id, total, proc.pid, cuda, int(cost_time), task.identifier)
             if cost_time < 30:
-                with open(io_folder / 'END_QUICKLY', 'w', encoding='utf-8') as f:
-                    f.write(f'cost_time: {cost_time} seconds.')
+                (io_folder / 'END_QUICKLY').write_text(f'cost_time: {cost_time} seconds.', encoding='utf-8')
 
             full_info['end_time'] = time.localtime()
-            with open(task_description_folder / "full_description.json", "w", encoding="utf-8") as f_task_desc:
-                json.dump(
-                    full_info,
-                    f_task_desc,
-                    indent=4,
-                )
+            await asyncio.to_thread(_atomic_json_write, task_description_folder / "full_description.json", full_info)
             return status
 
-    async def _run_single_process(self, cmd: str, io_folder: Union[Path, str], cwd: str, env: Dict[str, str],
+    async def _run_single_process(self, cmd: Union[str, List[str]], io_folder: Union[Path, str], cwd: str, env: Dict[str, str],
                                   task_description_folder, full_info, logging_callback):
         io_folder = Path(io_folder)
         timestamp = ('_' + str(int(time.time()))) if self.add_timestamp_to_log else ''
-        with open(io_folder / f"stdout{timestamp}.log", "w", encoding="utf-8") as f_out, open(
-            io_folder / f"stderr{timestamp}.log", "w", encoding="utf-8"
+        with open(io_folder / f"stdout{timestamp}.log", "wb", buffering=1 << 16) as f_out, open(
+            io_folder / f"stderr{timestamp}.log", "wb", buffering=1 << 16
         ) as f_err:
-            proc = await asyncio.create_subprocess_shell(cmd, stdout=f_out, stderr=f_err, cwd=cwd, env=env)
+            if isinstance(cmd, str):
+                proc = await asyncio.create_subprocess_shell(cmd, stdout=f_out, stderr=f_err, cwd=cwd, env=env)
+            else:
+                try:
+                    proc = await asyncio.create_subprocess_exec(*cmd, stdout=f_out, stderr=f_err, cwd=cwd, env=env)
+                except FileNotFoundError as err:
+                    if err.filename != cmd[0]:
+                        raise
+                    # Missing executable: let the shell report it (exit code 127) like before.
+                    proc = await asyncio.create_subprocess_shell(
+                        " ".join(cmd), stdout=f_out, stderr=f_err, cwd=cwd, env=env
+                    )
             full_info['pid'] = proc.pid
             logging_callback(proc.pid)
-            with open(task_description_folder / "full_description.json", "w", encoding="utf-8") as f_task_desc:
-                json.dump(
-                    full_info,
-                    f_task_desc,
-                    indent=4,
-                )
+            await asyncio.to_thread(_atomic_json_write, task_description_folder / "full_description.json", full_info)
             await proc.wait()
             return proc
 
@@ -11,12 +11,15 @@ def dict_to_namespace(d: Dict[str, Any]):
 def product(**kwargs):
     keys: List[str] = list(kwargs.keys())
     values = kwargs.values()
-    i = 1
-    for item in itertools.product(*values):
-        args = dict_to_namespace(dict(zip(keys, item)))
-        args.id = i
+    # Build the per-item dicts with C-level iterators; only the id and the
+    # Namespace wrapping remain in the Python loop.
+    all_fields = map(dict, map(zip, itertools.repeat(keys), itertools.product(*values)))
+    for i, fields in enumerate(all_fields, 1):
+        fields['id'] = i
+        # Bypass `Namespace.__init__`, which sets attributes one by one.
+        args = Namespace.__new__(Namespace)
+        args.__dict__ = fields
         yield args
-        i += 1
 
 
 class ConfigProduct:
@@ -27,7 +30,8 @@ class ConfigProduct:
             setattr(self, k, v)
 
     def __iter__(self):
-        yield from [self.__class__(**vars(item)) for item in product(**self._get_class_fields())]
+        for item in product(**self._get_class_fields()):
+            yield self.__class__(**vars(item))
 
     def __repr__(self) -> str:
         return self._get_instance_fields().__repr__()
@@ -16,9 +16,15 @@ def get_time(timezone_delta: int = 8):
 def convert_base(number, base_chars=BASE32_CHARS):
     base = len(base_chars)
     result = []
-    while number != 0:
-        number, i = divmod(number, base)
-        result.append(base_chars[i])
+    if base & (base - 1) == 0:  # power of two: shift and mask instead of divmod
+        bits, mask = base.bit_length() - 1, base - 1
+        while number != 0:
+            result.append(base_chars[number & mask])
+            number >>= bits
+    else:
+        while number != 0:
+            number, i = divmod(number, base)
+            result.append(base_chars[i])
     return "".join(result[::-1])
 
 
@@ -37,8 +43,13 @@ def today_cipher(extra_secs=0, add_date=True, num_chars=4, base_chars=BASE32_CHA
 
 
 def get_hash(obj: Any) -> str:
-    md5 = hashlib.md5(str(obj).encode())
-    return md5.hexdigest()
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        data = obj
+    elif isinstance(obj, str):
+        data = obj.encode()
+    else:
+        data = str(obj).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
 
 def json_dump(obj, file_path=None, mode='w', temp_folder=None, **kwargs):
@@ -4,14 +4,13 @@
 
 import asyncio
 import datetime
-import heapq
 import json
 import os
-import subprocess
 import time
 from pathlib import Path
 from typing import List, Union
-from copy import deepcopy
+
+from ._gpu import avail_cuda_list
 
 try:
     from termcolor import colored
@@ -35,29 +34,6 @@ def readable_seconds(seconds):
     return f"{seconds // 3600:02d}:{ seconds // 60 % 60:02d}:{seconds % 60:02d}"
 
 
-def avail_cuda_list(memory_requirement: int):
-    with subprocess.Popen(
-        "nvidia-smi -q -d Memory | grep -A5 GPU | grep Free", shell=True, stdout=subprocess.PIPE
-    ) as p:
-        free_mem = [(-int(x.split()[2]), i) for i, x in enumerate(p.stdout.readlines())]
-
-    heapq.heapify(free_mem)
-
-    def _get_one(free_mem):
-        free, idx = free_mem[0]
-        if free + memory_requirement > -20:
-            return -1
-        heapq.heapreplace(free_mem, (free + memory_requirement, idx))
-        return idx
-
-    result = []
-    i = _get_one(free_mem)
-    while i >= 0:
-        result.append(i)
-        i = _get_one(free_mem)
-    return result
-
-
 class Job:
     def __init__(self, cmd, cwd, io_folder, env=None) -> None:
         self.cmd = cmd
@@ -97,20 +73,34 @@ class Launcher:
         queue = asyncio.Queue()
         for cuda in cuda_list:
             queue.put_nowait(cuda)
+        sem = asyncio.Semaphore(len(cuda_list))
+
+        async def _bounded_run(job: Job, job_id: int):
+            async with sem:
+                cuda = await queue.get()
+                try:
+                    await self._async_run_job(cuda, job, job_id)
+                except Exception as err:
+                    print(now_time(), f"FAILED job #{job_id} ({err!r}): {job.cmd_str}")
+                    async with self.lock:
+                        self.job_status[job_id] = "failed"
+                finally:
+                    await queue.put(cuda)
+
         tasks = []
         for job_id, job in enumerate(jobs):
             print(f"Job [{job_id}/{len(jobs)}]:", job.cmd_str)
-            tasks.append(self._async_run_job(queue, job, job_id))
-        await asyncio.gather(*tasks)
+            tasks.append(asyncio.ensure_future(_bounded_run(job, job_id)))
+        for task in asyncio.as_completed(tasks):
+            await task
 
-    async def _async_run_job(self, queue: asyncio.Queue, job: Job, job_id: int):
-        cuda = await queue.get()
+    async def _async_run_job(self, cuda: Union[str, int], job: Job, job_id: int):
         # Got a cuda. Launch!
         async with self.lock:
             self.job_status[job_id] = "running"
         job_info = f"{now_time()} Starting job #{job_id} with cuda={cuda}: {job.cmd_str}"
         print(colored(job_info, "green"))
-        env = deepcopy(job.env) or deepcopy(self.env) or deepcopy(os.environ)
+        env = dict(job.env or self.env or os.environ)
         env["CUDA_VISIBLE_DEVICES"] = str(cuda)
         if job.io_folder is not None:
             io_folder = Path(job.io_folder)
@@ -143,7 +133,6 @@ class Launcher:
             status = "failed"
         async with self.lock:
             self.job_status[job_id] = status
-        await queue.put(cuda)
 
 
 if __name__ == "__main__":
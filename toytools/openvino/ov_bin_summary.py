@@ -1,16 +1,16 @@
+import base64
 import json
-import pickle
-from dataclasses import asdict, dataclass
+import math
+import mmap
+import os
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import List, Literal, Optional, Union
+from typing import List, Literal, Optional, Tuple, Union
+from xml.etree import ElementTree
 
 import numpy as np
 
-try:
-    from openvino.runtime import Core
-except:
-    pass
-
+RANDOM_CHUNK_SIZE = 1 << 20
 BYTES_GENERATORS = {
     "ones": lambda length: np.ones((length,), dtype=np.uint8).tobytes(),
     "zeros": lambda length: np.zeros((length,), dtype=np.uint8).tobytes(),
@@ -23,19 +23,29 @@ class _OVBinSummaryPart:
     start: int
     length: int = 0
     op_name: Optional[str] = None
-    value: Optional[np.ndarray] = None
+    value: Optional[Union[bytes, memoryview]] = None
     index: int = -1
 
     @classmethod
     def from_dict(cls, content: dict):
         value = content.pop("value")
-        value = np.array(value, dtype=np.uint8)
+        value_encoding = content.pop("value_encoding", None)
+        if value is not None:
+            if value_encoding == "b64":
+                value = base64.b64decode(value)
+            else:  # plain list of ints, as written by older versions
+                value = bytes(value)
         return cls(value=value, **content)
 
+    @property
+    def value_np(self) -> Optional[np.ndarray]:
+        return None if self.value is None else np.frombuffer(self.value, dtype=np.uint8)
+
     def to_dict(self):
-        result = asdict(self)
-        if result["value"] is not None:
-            result["value"] = result["value"].tolist()
+        result = {field.name: getattr(self, field.name) for field in fields(self)}
+        if self.value is not None:
+            result["value"] = base64.b64encode(self.value).decode("ascii")
+            result["value_encoding"] = "b64"
         return result
 
 
@@ -44,55 +54,91 @@ class OVBinSummary:
 
     def __init__(self, parts: List[_OVBinSummaryPart]):
         self.parts = parts
+        self._source_mm: Optional[mmap.mmap] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._source_mm is not None:
+            # Copy the values that view into the mapping so it can be unmapped; the summary stays usable.
+            for part in self.parts:
+                if isinstance(part.value, memoryview):
+                    view, part.value = part.value, bytes(part.value)
+                    view.release()
+            self._source_mm.close()
+            self._source_mm = None
 
     @classmethod
     def from_xml(cls, xml_path: Union[str, Path]):
         xml_path = Path(xml_path).resolve()
-        ovmodel = cls._read_ov_model(xml_path)
-        reference_array = cls._read_from_bin(xml_path.with_suffix(".bin"))
+        reference_mm = cls._read_from_bin(xml_path.with_suffix(".bin"))
+        reference_view = memoryview(reference_mm)
+        constant_ranges = cls._read_constant_ranges(xml_path)
+        if constant_ranges is None:
+            constant_ranges = cls._search_constant_ranges(cls._read_ov_model(xml_path), reference_mm)
 
         parts: List[_OVBinSummaryPart] = []
         cur = 0
-        for op in ovmodel.get_ordered_ops():
-            if "constant" in str(op.get_type_info()).lower():
-                vector = op.get_vector()
-                if vector.size > 10:
-                    converted_uint8 = np.frombuffer(vector.tobytes(), dtype=np.uint8)
-                    starting_index = cls._find_index(reference_array, cur, converted_uint8)
-                    assert starting_index >= cur
-                    if starting_index > cur:
-                        parts.append(
-                            _OVBinSummaryPart(
-                                start=cur,
-                                length=starting_index - cur,
-                                value=reference_array[cur:starting_index],
-                            )
-                        )
-                    parts.append(
-                        _OVBinSummaryPart(
-                            start=starting_index,
-                            length=converted_uint8.size,
-                            op_name=op.get_name(),
-                        )
+        for op_name, starting_index, length in constant_ranges:
+            if starting_index + length > len(reference_view):
+                raise ValueError(f"Constant {op_name} ends past the end of {xml_path.with_suffix('.bin')}.")
+            if starting_index < cur:  # shares bytes with a constant that is already covered
+                continue
+            if starting_index > cur:
+                parts.append(
+                    _OVBinSummaryPart(
+                        start=cur,
+                        length=starting_index - cur,
+                        value=reference_view[cur:starting_index],
                     )
-                    cur = starting_index + converted_uint8.size
+                )
+            parts.append(
+                _OVBinSummaryPart(
+                    start=starting_index,
+                    length=length,
+                    op_name=op_name,
+                )
+            )
+            cur = starting_index + length
 
-        if cur < reference_array.size:
+        if cur < len(reference_view):
             parts.append(
                 _OVBinSummaryPart(
                     start=cur,
-                    value=reference_array[cur:],
-                    length=reference_array.size - cur,
+                    value=reference_view[cur:],
+                    length=len(reference_view) - cur,
                 )
             )
-        return cls(parts=parts)
+        summary = cls(parts=parts)
+        if isinstance(reference_mm, mmap.mmap):
+            summary._source_mm = reference_mm
+        return summary
 
     @classmethod
     def from_summary(cls, summary_path: Union[str, Path]):
         summary_path = Path(summary_path)
         with open(summary_path, "rb") as f:
-            parts = pickle.load(f)
-            return cls(parts=parts)
+            header = json.load(f)
+        # Values stay on disk; each part is a view into the mapped .npy, paged in on demand.
+        with open(summary_path.with_name(header["values_file"]), "rb") as f:
+            np.lib.format.read_magic(f)
+            np.lib.format.read_array_header_1_0(f)
+            data_offset = f.tell()
+            values_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        values = memoryview(values_mm)[data_offset:]
+        parts = []
+        for meta in header["parts"]:
+            value_offset = meta.pop("value_offset", None)
+            value_size = meta.pop("value_size", None)
+            value = None if value_offset is None else values[value_offset:value_offset + value_size]
+            parts.append(_OVBinSummaryPart(value=value, **meta))
+        summary = cls(parts=parts)
+        summary._source_mm = values_mm
+        return summary
 
     @classmethod
     def from_json(cls, json_path: Union[str, Path]):
@@ -103,44 +149,112 @@ class OVBinSummary:
 
     def to_summary(self, save_path: Union[str, Path]):
         save_path = Path(save_path)
-        with open(save_path, "wb") as f:
-            pickle.dump(self.parts, f)
+        header, values, value_offset = [], [], 0
+        for part in self.parts:
+            meta = {field.name: getattr(part, field.name) for field in fields(part) if field.name != "value"}
+            if part.value is not None:
+                meta["value_offset"] = value_offset
+                meta["value_size"] = len(part.value)
+                values.append(part.value)
+                value_offset += len(part.value)
+            header.append(meta)
+        values_path = save_path.with_name(save_path.name + ".npy")
+        # The values may be views into a mapping of `values_path` itself (a summary saved over
+        # the one it was loaded from), so write a sibling file and swap it in.
+        tmp_path = values_path.with_name(values_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            # Stream the values after an .npy header instead of concatenating them in memory.
+            np.lib.format.write_array_header_1_0(f, {"descr": "|u1", "fortran_order": False, "shape": (value_offset,)})
+            for value in values:
+                f.write(value)
+        os.replace(tmp_path, values_path)
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump({"values_file": values_path.name, "parts": header}, f)
 
     def to_json(self, save_path: Union[str, Path]):
         with open(save_path, "w") as f:
             json.dump([part.to_dict() for part in self.parts], f, indent=2)
 
     def to_bin(self, save_path: Union[str, Path], bytes_generator: Literal["ones", "zeros", "random"] = "ones"):
-        with open(save_path, "wb") as f:
+        scratch = memoryview(b"")
+        if bytes_generator != "zeros":
+            pad_length = max((part.length for part in self.parts if part.value is None), default=0)
+            if bytes_generator == "random":
+                pad_length = min(pad_length, RANDOM_CHUNK_SIZE)
+            scratch = memoryview(BYTES_GENERATORS[bytes_generator](pad_length))
+        # Stored values may be views into a mapping of `save_path` itself; truncating it in place
+        # would pull the pages out from under them, so write a sibling file and swap it in.
+        tmp_path = Path(save_path).with_name(Path(save_path).name + ".tmp")
+        with open(tmp_path, "wb") as f:
             for part in self.parts:
                 if part.value is not None:
-                    f.write(part.value.tobytes())
+                    f.write(part.value)
+                elif bytes_generator == "zeros":
+                    f.seek(part.length, os.SEEK_CUR)  # leave a hole; it reads back as zeros
                 else:
-                    f.write(BYTES_GENERATORS[bytes_generator](part.length))
+                    remaining = part.length
+                    while remaining > 0:
+                        chunk = scratch[:remaining]
+                        f.write(chunk)
+                        remaining -= len(chunk)
+            f.truncate()  # materialize a trailing hole
+        os.replace(tmp_path, save_path)
         return save_path
 
     @staticmethod
-    def _read_from_bin(bin_path: Union[str, Path]):
+    def _read_from_bin(bin_path: Union[str, Path]) -> Union[mmap.mmap, bytes]:
         with open(bin_path, "rb") as f:
-            return np.frombuffer(f.read(), dtype=np.uint8)
+            if os.fstat(f.fileno()).st_size == 0:  # IRs without weights; mmap rejects empty files
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
     @classmethod
     def _read_ov_model(cls, xml_path: Union[str, Path]):
         if cls.ie is None:
+            from openvino.runtime import Core
             cls.ie = Core()
         return cls.ie.read_model(model=Path(xml_path).resolve())
 
     @staticmethod
-    def _find_index(vector, starting_index, sub_vector):
-        length = sub_vector.size
-        for i in range(starting_index, vector.size - length + 1):
-            if (vector[i : i + length] == sub_vector).all():
-                return i
-        raise ValueError("Model analysis failed.")
+    def _read_constant_ranges(xml_path: Union[str, Path]) -> Optional[List[Tuple[str, int, int]]]:
+        # IR `Const` layers record where their data lives in the .bin; returns None if any range is missing.
+        ranges = []
+        for _, layer in ElementTree.iterparse(xml_path):
+            if layer.tag != "layer":
+                continue
+            if layer.get("type") == "Const":
+                data = layer.find("data")
+                if data is None or data.get("offset") is None or data.get("size") is None:
+                    return None
+                shape = data.get("shape", "")
+                if math.prod(int(dim) for dim in shape.split(",") if dim) > 10:
+                    ranges.append((layer.get("name"), int(data.get("offset")), int(data.get("size"))))
+            layer.clear()  # processed layers are not needed again; keeps memory flat on large IRs
+        ranges.sort(key=lambda item: (item[1], -item[2]))
+        return ranges
+
+    @classmethod
+    def _search_constant_ranges(cls, ovmodel, reference_mm: mmap.mmap):
+        # Constants are yielded lazily, so at most one weight buffer is materialized at a time.
+        constant_ops = [op for op in ovmodel.get_ordered_ops() if "constant" in str(op.get_type_info()).lower()]
+        cur = 0
+        for op in constant_ops:
+            vector = op.get_vector()
+            if vector.size > 10:
+                sub_bytes = vector.tobytes()
+                starting_index = cls._find_index(reference_mm, cur, sub_bytes)
+                yield op.get_friendly_name(), starting_index, len(sub_bytes)
+                cur = starting_index + len(sub_bytes)
+
+    @staticmethod
+    def _find_index(vector: Union[bytes, mmap.mmap], starting_index: int, sub_vector: bytes) -> int:
+        index = vector.find(sub_vector, starting_index)
+        if index < 0:
+            raise ValueError("Model analysis failed.")
+        return index
 
 
 if __name__ == "__main__":
-    import os
     import shutil
     import tempfile
 
@@ -1,11 +1,14 @@
 import datetime
+import re
 import shutil
 import socket
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
 
-import pandas as pd
+
+# The last "Average:" latency followed by the "Throughput:" line, with no other "Average:" in between.
+_RESULT_PATTERN = re.compile(rb'Average:\s+([\d.]+)(?:(?!Average:).)*?Throughput:\s+([\d.]+)', re.DOTALL)
 
 
 @dataclass
@@ -21,28 +24,21 @@ class BenchmarkResult:
 
 def run_ov_benchmark(cmd):
     from openvino.runtime import get_version
-    with subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as p:
-        p.wait()
-        stdout = p.stdout.read().decode()
-        stderr = p.stderr.read().decode()
-        stdout = stdout.strip()
-        avg_line = filter(None, stdout.split('\n')[-4].split())
-        throughput_line = filter(None, stdout.split('\n')[-1].split())
-        avg_line = list(avg_line)
-        throughput_line = list(throughput_line)
-        avg_latency = -1
-        throughput = -1
-        status_ok = False
-        if 'Average:' in avg_line and 'Throughput:' in throughput_line:
-            avg_latency = float(list(avg_line)[-2])
-            throughput = float(list(throughput_line)[-2])
-            status_ok = True
-        return BenchmarkResult(
-            stdout=stdout,
-            stderr=stderr,
-            avg_latency=avg_latency,
-            throughput=throughput,
-            cmd=cmd,
-            openvino_version=get_version(),
-            status_ok=status_ok,
-        )
+    # communicate() drains both pipes while waiting, so a chatty benchmark cannot block on a full pipe.
+    p = subprocess.run(cmd, shell=True, capture_output=True)
+    avg_latency = -1
+    throughput = -1
+    status_ok = False
+    matches = _RESULT_PATTERN.findall(p.stdout)
+    if matches:
+        avg_latency, throughput = map(float, matches[-1])
+        status_ok = True
+    return BenchmarkResult(
+        stdout=p.stdout.decode().strip(),
+        stderr=p.stderr.decode(),
+        avg_latency=avg_latency,
+        throughput=throughput,
+        cmd=cmd,
+        openvino_version=get_version(),
+        status_ok=status_ok,
+    )
@@ -1,31 +1,36 @@
 import argparse
+import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
 def _log_package_status(name, package_folder, logging_folder):
-    p = subprocess.run(["git", "status"], capture_output=True, cwd=package_folder, check=True)
+    p = subprocess.run(["git", "-C", package_folder, "status"], capture_output=True, check=True)
     result_list = [p.stdout.decode(), p.stderr.decode(), "=" * 20]
-    p = subprocess.run(["git", "log", "-n", "3"], capture_output=True, cwd=package_folder, check=True)
+    p = subprocess.run(["git", "-C", package_folder, "log", "-n", "3"], capture_output=True, check=True)
     result_list += [p.stdout.decode(), p.stderr.decode()]
     with open(logging_folder / f"{name}.git-status", "w") as file:
         file.write("\n".join(result_list))
     with open(logging_folder / f"{name}.git-patch", "w") as file:
-        subprocess.run(["git", "diff"], cwd=package_folder, stdout=file, check=True)
+        subprocess.run(["git", "-C", package_folder, "diff"], stdout=file, check=True)
 
 
 def log_python_env_status(logging_folder):
     folder = Path(logging_folder, "python_env_status")
     folder.mkdir(exist_ok=True, parents=True)
-    p = subprocess.run(["pip", "list"], capture_output=True)
-    with open(folder / "pip.txt", "w", encoding="utf8") as f:
-        subprocess.run(["pip", "list"], stdout=f, check=True)
+    pip_list = subprocess.run(["pip", "list"], capture_output=True, check=True).stdout
+    (folder / "pip.txt").write_bytes(pip_list)
     with open(folder / "conda.txt", "w", encoding="utf8") as f:
         subprocess.run(["conda", "list"], stdout=f, check=True)
-    for row in p.stdout.decode().split("\n")[2:]:
+    local_packages = []
+    for row in pip_list.decode().split("\n")[2:]:
         cols = row.split()
         if len(cols) == 3:  # means locally installed package
-            status = _log_package_status(cols[0], cols[2], folder)
+            local_packages.append((cols[0], cols[2]))
+    # The git calls mostly wait on subprocesses, so run packages concurrently.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(lambda item: _log_package_status(*item, folder), local_packages))
 
 
 parser = argparse.ArgumentParser()